@@ -1,6 +1,7 @@
 """
 Utility functions for the Smart Accounting application.
 """
+import logging
 import re
 import hashlib
 import secrets
@@ -13,6 +14,18 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+logger = logging.getLogger(__name__)
+
+# Display symbols used by format_currency
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£',
+    'JPY': '¥',
+    'CAD': 'C$',
+    'AUD': 'A$',
+}
+
 
 def generate_secure_token(length: int = 32) -> str:
     """
@@ -199,16 +212,7 @@ def format_currency(amount: Union[int, float], currency: str = 'USD',
     Returns:
         str: Formatted currency string
     """
-    currency_symbols = {
-        'USD': '$',
-        'EUR': '€',
-        'GBP': '£',
-        'JPY': '¥',
-        'CAD': 'C$',
-        'AUD': 'A$',
-    }
-    
-    symbol = currency_symbols.get(currency, currency)
+    symbol = CURRENCY_SYMBOLS.get(currency, currency)
     
     if currency == 'JPY':
         # Japanese Yen doesn't use decimal places
@@ -333,9 +337,11 @@ def send_templated_email(subject: str, template_name: str, context: Dict[str, An
         email.send()
         return True
         
-    except Exception as e:
-        # Log the error (you might want to use proper logging here)
-        print(f"Failed to send email: {str(e)}")
+    except Exception:
+        logger.exception(
+            "Failed to send email",
+            extra={'template_name': template_name, 'recipient_count': len(to_emails)}
+        )
         return False
 
 
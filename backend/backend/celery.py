@@ -35,12 +35,16 @@ _is_web_dyno = _dyno.startswith("web.")
 # Allow explicit override via env (1=disable result backend everywhere)
 _disable_result = os.getenv("DISABLE_CELERY_RESULT", "0") == "1"
 
-broker_url = _broker
+# Test runs (same check as settings.TESTING) run tasks inline and never
+# reach for Redis
+_testing = sys.argv[1:2] == ["test"] or "pytest" in sys.modules
+
+broker_url = "memory://" if _testing else _broker
 
 # Result backend logic:
 #  - On worker/beat dynos: use Redis result backend (default).
 #  - On web dynos or when disabled: no result backend and ignore results.
-if _is_web_dyno or _disable_result:
+if _is_web_dyno or _disable_result or _testing:
     result_backend = None
     task_ignore_result = True
     result_extended = False
@@ -50,7 +54,7 @@ else:
     result_extended = False
 
 # TLS for broker/result (Heroku Redis supports CA‑signed certs; you can set 'required')
-_use_ssl = os.getenv("CELERY_BROKER_USE_SSL", "1") == "1"
+_use_ssl = os.getenv("CELERY_BROKER_USE_SSL", "1") == "1" and not _testing
 _cert_reqs = os.getenv("CELERY_SSL_CERT_REQS", "none")   # 'required' if you want strict verify
 _ssl_cfg = {"ssl_cert_reqs": _cert_reqs} if _use_ssl else None
 
@@ -106,8 +110,8 @@ app.conf.update(
     result_expires=3600,  # 1 hour
     
     # Enhanced Heroku reliability settings
-    task_always_eager=False,
-    task_eager_propagates=False,
+    task_always_eager=_testing,
+    task_eager_propagates=_testing,
     worker_send_task_events=True,
     task_send_sent_event=True,
     
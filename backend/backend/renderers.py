@@ -0,0 +1,46 @@
+"""
+JSON renderer backed by orjson when it is installed.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# DRF's encoder handles whatever orjson hands back (Decimal, lazy strings,
+# datetimes), so those render as they do with the stock JSONRenderer
+_drf_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer that serializes with orjson.
+    Falls back to the stock renderer when orjson is missing, indented output
+    is requested, or orjson cannot encode the data (e.g. integers wider than
+    64 bits).
+
+    One difference remains: float NaN and infinities render as null, where
+    the stock renderer (with STRICT_JSON) raises a ValueError.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not ORJSON_AVAILABLE:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_drf_encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the JS line separators exactly like JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 import dj_database_url
 from dotenv import load_dotenv
@@ -238,6 +239,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
@@ -393,7 +398,13 @@ HTTP_CLIENT_SETTINGS = {
 
 # Concurrent Processing Limits
 MAX_CONCURRENT_OCR_REQUESTS = int(os.environ.get('MAX_CONCURRENT_OCR_REQUESTS', '8'))
+# OCR threads per web process; each needs a DB connection while a batch runs,
+# so with 3 gunicorn workers the default adds at most 6 connections
+OCR_THREAD_POOL_SIZE = int(os.environ.get('OCR_THREAD_POOL_SIZE', '2'))
+OCR_API_CALLS_PER_WORKER = int(os.environ.get('OCR_API_CALLS_PER_WORKER', '4'))  # in-flight vision calls per OCR thread
 THREAD_POOL_MAX_WORKERS = int(os.environ.get('THREAD_POOL_MAX_WORKERS', '16'))
+# Send OCR batches to a Celery worker (ocr_batch queue) instead of the web process's thread pool
+OCR_USE_CELERY = os.environ.get('OCR_USE_CELERY', 'False').lower() == 'true'
 
 # Performance Monitoring
 ENABLE_PERFORMANCE_MONITORING = os.environ.get('ENABLE_PERFORMANCE_MONITORING', 'True').lower() == 'true'
@@ -420,6 +431,46 @@ if 'DYNO' in os.environ:
 else:
     HEROKU_DEPLOYMENT = False
 
+# Test runs (manage.py test or pytest)
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+if TESTING:
+    import atexit
+    import shutil
+    import tempfile
+    
+    # Keep uploaded test files in memory instead of writing them under MEDIA_ROOT
+    DEFAULT_FILE_STORAGE = 'django.core.files.storage.InMemoryStorage'
+    
+    # Anything that still touches the filesystem gets a temporary media
+    # directory; with --parallel, the test runner gives each worker its own
+    # subdirectory, since forked workers would otherwise share this one
+    MEDIA_ROOT = tempfile.mkdtemp(prefix=f'media_{os.getpid()}_')
+    atexit.register(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+    TEST_RUNNER = 'backend.test_runner.TestRunner'
+    
+    # Test users don't need a slow key-derivation hash; MD5 keeps create_user cheap
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Cache: Heroku Redis when attached, so every web process sees the same entries
+# and invalidations; per-process memory otherwise (local development, tests)
+_cache_url = os.environ.get('REDIS_TLS_URL') or os.environ.get('REDIS_URL')
+if _cache_url and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': _cache_url,
+            # Heroku Redis TLS uses self-signed certificates
+            'OPTIONS': {'ssl_cert_reqs': None} if _cache_url.startswith('rediss://') else {},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Django Logging Configuration  
 LOGGING = {
     'version': 1,
@@ -440,27 +491,21 @@ LOGGING = {
             'formatter': 'verbose' if DEBUG else 'simple',
         },
     },
+    # App loggers only set levels and propagate to root's handler, so each
+    # record is formatted and written to stdout once
     'loggers': {
         'receipts': {
-            'handlers': ['console'],
             'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': True,
         },
         'receipts.services': {
-            'handlers': ['console'],
             'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': True,
         },
         'receipts.views': {
-            'handlers': ['console'],
             'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': True,
         },
-        'enhanced_openai_service': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': True,
-        },
     },
     'root': {
         'handlers': ['console'],
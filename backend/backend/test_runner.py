@@ -0,0 +1,24 @@
+"""
+Test runner that gives each parallel test worker its own MEDIA_ROOT.
+"""
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner, ParallelTestSuite, _init_worker
+
+
+def _init_media_worker(counter, *args, **kwargs):
+    """Set up the worker's test databases, then point it at a private media directory"""
+    _init_worker(counter, *args, **kwargs)
+    # Forked workers inherit the MEDIA_ROOT settings created at import time, so
+    # each one takes a subdirectory of it; the parent's cleanup removes them all
+    override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='worker_', dir=settings.MEDIA_ROOT)).enable()
+
+
+class MediaIsolatingParallelTestSuite(ParallelTestSuite):
+    init_worker = _init_media_worker
+
+
+class TestRunner(DiscoverRunner):
+    parallel_test_suite = MediaIsolatingParallelTestSuite
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-16 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0004_add_cloudinary_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='content_sha256',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the uploaded file, used to spot re-uploads', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-16 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('receipts', '0005_receipt_content_sha256'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'transaction_type'], name='receipts_tx_owner_type_idx'),
+        ),
+    ]
@@ -21,6 +21,13 @@ class Receipt(models.Model):
     original_filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    content_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text="SHA-256 of the uploaded file, used to spot re-uploads"
+    )
     
     # Cloudinary storage fields
     cloudinary_public_id = models.CharField(max_length=500, blank=True, null=True)
@@ -272,6 +279,10 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-transaction_date']
+        indexes = [
+            # Serves per-user filtering and grouping by type
+            models.Index(fields=['owner', 'transaction_type'], name='receipts_tx_owner_type_idx'),
+        ]
         
     def __str__(self):
         return f"{self.vendor_name} - {self.transaction_date} - {self.currency} {self.total_amount}"
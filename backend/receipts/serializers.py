@@ -1,8 +1,18 @@
 from rest_framework import serializers
-from decimal import Decimal
 from .models import Receipt, Transaction, APIUsageStats
 from .utils import DecimalEncoder, safe_decimal_to_float, normalize_extracted_data, normalize_processing_metadata
 
+# Content types ReceiptUploadSerializer accepts
+UPLOAD_CONTENT_TYPES = ('image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp')
+ALLOWED_UPLOAD_CONTENT_TYPES = frozenset(UPLOAD_CONTENT_TYPES)
+UNSUPPORTED_UPLOAD_TYPE_MESSAGE = f'Unsupported file type. Allowed types: {", ".join(UPLOAD_CONTENT_TYPES)}'
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB limit for complex receipts
+UPLOAD_TOO_LARGE_MESSAGE = f'File too large. Maximum size is {MAX_UPLOAD_SIZE/(1024*1024)}MB'
+
+# Numeric keys ReceiptSerializer coerces to float (Decimals included)
+EXTRACTED_NUMERIC_FIELDS = ('total', 'tax', 'total_amount', 'tax_amount')
+METADATA_NUMERIC_FIELDS = ('processing_time', 'cost_usd', 'token_usage', 'segments_processed')
+
 
 class TransactionSerializer(serializers.ModelSerializer):
     """
@@ -96,18 +106,8 @@ class ReceiptSerializer(serializers.ModelSerializer):
                 data['extracted_data'] = new_ed
                 ed = new_ed
             
-            # Convert Decimal fields to float for JSON serialization
-            if isinstance(ed.get('total'), Decimal):
-                ed['total'] = float(ed['total'])
-            if isinstance(ed.get('tax'), Decimal):
-                ed['tax'] = float(ed['tax'])
-            if isinstance(ed.get('total_amount'), Decimal):
-                ed['total_amount'] = float(ed['total_amount'])
-            if isinstance(ed.get('tax_amount'), Decimal):
-                ed['tax_amount'] = float(ed['tax_amount'])
-            
-            # Ensure numeric fields are properly converted
-            for field in ['total', 'tax', 'total_amount', 'tax_amount']:
+            # Ensure numeric fields (Decimals included) are floats
+            for field in EXTRACTED_NUMERIC_FIELDS:
                 if field in ed and ed[field] is not None:
                     try:
                         ed[field] = float(ed[field])
@@ -132,18 +132,14 @@ class ReceiptSerializer(serializers.ModelSerializer):
         if 'processing_metadata' in data and data['processing_metadata']:
             pm = data['processing_metadata']
             
-            # Convert Decimal cost to float
-            if isinstance(pm.get('cost_usd'), Decimal):
-                pm['cost_usd'] = float(pm['cost_usd'])
-            
             # Ensure performance fields are present and properly typed
             pm.setdefault('processing_time', pm.get('time_sec', 0))
-            pm.setdefault('cost_usd', pm.get('cost_usd', 0))
+            pm.setdefault('cost_usd', 0)
             pm.setdefault('token_usage', (pm.get('input_tokens', 0) + pm.get('output_tokens', 0)))
             pm.setdefault('segments_processed', pm.get('segments', 1))
             
             # Ensure numeric fields
-            for field in ['processing_time', 'cost_usd', 'token_usage', 'segments_processed']:
+            for field in METADATA_NUMERIC_FIELDS:
                 if field in pm and pm[field] is not None:
                     try:
                         pm[field] = float(pm[field])
@@ -175,19 +171,13 @@ class ReceiptUploadSerializer(serializers.ModelSerializer):
     
     def validate_file(self, value):
         """Validate uploaded file."""
-        # Check file size (50MB limit for complex receipts)
-        max_size = 50 * 1024 * 1024  # 50MB
-        if value.size > max_size:
-            raise serializers.ValidationError(
-                f'File too large. Maximum size is {max_size/(1024*1024)}MB'
-            )
+        # Check file size
+        if value.size > MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(UPLOAD_TOO_LARGE_MESSAGE)
         
         # Check file type
-        allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
-        if value.content_type not in allowed_types:
-            raise serializers.ValidationError(
-                f'Unsupported file type. Allowed types: {", ".join(allowed_types)}'
-            )
+        if value.content_type not in ALLOWED_UPLOAD_CONTENT_TYPES:
+            raise serializers.ValidationError(UNSUPPORTED_UPLOAD_TYPE_MESSAGE)
         
         return value
     
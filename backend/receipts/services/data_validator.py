@@ -3,67 +3,111 @@ Data validation and cleansing service for receipt processing.
 """
 import re
 import logging
+from functools import lru_cache
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 from typing import Dict, Any, Optional, List
 
 logger = logging.getLogger(__name__)
 
+# Patterns used on every cleaned field, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+NON_DIGIT_RE = re.compile(r'[^\d]')
+NUMBER_RE = re.compile(r'[\d.]+')
+TIME_RE = re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2}))?')
+
+# Common date formats in one alternation, so a date string is scanned once:
+# YYYY-MM-DD, or DD/MM/YYYY, DD-MM-YYYY, DD.MM.YYYY (same separator twice)
+DATE_RE = re.compile(
+    r'(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})'
+    r'|(?P<day>\d{1,2})(?P<sep>[/.-])(?P<month>\d{1,2})(?P=sep)(?P<year>\d{4})'
+)
+
+# Categories the rest of the app understands, and keywords mapped onto them
+VALID_CATEGORIES = frozenset([
+    'office_supplies', 'travel', 'meals', 'utilities', 'rent',
+    'software', 'hardware', 'professional_services', 'marketing', 'other'
+])
+
+# Currency symbols recognised in amounts and currency fields
+CURRENCY_SYMBOLS = {
+    '£': 'GBP',
+    '$': 'USD',
+    '€': 'EUR',
+    '¥': 'JPY'
+}
+KNOWN_CURRENCY_CODES = frozenset(CURRENCY_SYMBOLS.values())
+
+# Strips currency symbols, spaces and thousands separators in one pass
+AMOUNT_STRIP_TABLE = str.maketrans('', '', ''.join(CURRENCY_SYMBOLS) + ' ,')
+
+CATEGORY_MAPPING = {
+    'office': 'office_supplies',
+    'stationery': 'office_supplies',
+    'supplies': 'office_supplies',
+    'transport': 'travel',
+    'taxi': 'travel',
+    'uber': 'travel',
+    'train': 'travel',
+    'flight': 'travel',
+    'hotel': 'travel',
+    'fuel': 'travel',
+    'petrol': 'travel',
+    'restaurant': 'meals',
+    'food': 'meals',
+    'coffee': 'meals',
+    'lunch': 'meals',
+    'dinner': 'meals',
+    'electricity': 'utilities',
+    'gas': 'utilities',
+    'water': 'utilities',
+    'internet': 'utilities',
+    'phone': 'utilities',
+    'mobile': 'utilities',
+    'software': 'software',
+    'subscription': 'software',
+    'saas': 'software',
+    'license': 'software',
+    'computer': 'hardware',
+    'laptop': 'hardware',
+    'equipment': 'hardware',
+    'printer': 'hardware',
+    'consulting': 'professional_services',
+    'legal': 'professional_services',
+    'accounting': 'professional_services',
+    'audit': 'professional_services',
+    'advertising': 'marketing',
+    'marketing': 'marketing',
+    'promotion': 'marketing',
+    'website': 'marketing',
+    'rent': 'rent',
+    'lease': 'rent',
+    'office space': 'rent'
+}
+
+
+@lru_cache(maxsize=128)
+def map_category(category_str: str) -> str:
+    """Map a normalised category suggestion onto a valid category."""
+    # Direct match
+    if category_str in VALID_CATEGORIES:
+        return category_str
+    
+    # Fuzzy matching
+    for keyword, mapped_category in CATEGORY_MAPPING.items():
+        if keyword in category_str:
+            return mapped_category
+    
+    return 'other'
+
 
 class ReceiptDataValidator:
     """Validates and cleanses extracted receipt data."""
     
     def __init__(self):
-        self.currency_symbols = {
-            '£': 'GBP',
-            '$': 'USD',
-            '€': 'EUR',
-            '¥': 'JPY'
-        }
+        self.currency_symbols = CURRENCY_SYMBOLS
+        self.amount_strip_table = AMOUNT_STRIP_TABLE
         
-        self.category_mapping = {
-            'office': 'office_supplies',
-            'stationery': 'office_supplies',
-            'supplies': 'office_supplies',
-            'transport': 'travel',
-            'taxi': 'travel',
-            'uber': 'travel',
-            'train': 'travel',
-            'flight': 'travel',
-            'hotel': 'travel',
-            'fuel': 'travel',
-            'petrol': 'travel',
-            'restaurant': 'meals',
-            'food': 'meals',
-            'coffee': 'meals',
-            'lunch': 'meals',
-            'dinner': 'meals',
-            'electricity': 'utilities',
-            'gas': 'utilities',
-            'water': 'utilities',
-            'internet': 'utilities',
-            'phone': 'utilities',
-            'mobile': 'utilities',
-            'software': 'software',
-            'subscription': 'software',
-            'saas': 'software',
-            'license': 'software',
-            'computer': 'hardware',
-            'laptop': 'hardware',
-            'equipment': 'hardware',
-            'printer': 'hardware',
-            'consulting': 'professional_services',
-            'legal': 'professional_services',
-            'accounting': 'professional_services',
-            'audit': 'professional_services',
-            'advertising': 'marketing',
-            'marketing': 'marketing',
-            'promotion': 'marketing',
-            'website': 'marketing',
-            'rent': 'rent',
-            'lease': 'rent',
-            'office space': 'rent'
-        }
     
     def validate_and_clean(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -183,7 +227,7 @@ class ReceiptDataValidator:
         
         text = str(text).strip()
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         return text
     
     def _clean_phone_number(self, phone: Any) -> str:
@@ -193,7 +237,7 @@ class ReceiptDataValidator:
         
         phone = str(phone)
         # Remove all non-digit characters
-        digits = re.sub(r'[^\d]', '', phone)
+        digits = NON_DIGIT_RE.sub('', phone)
         
         # Format UK phone numbers
         if len(digits) == 11 and digits.startswith('0'):
@@ -214,30 +258,17 @@ class ReceiptDataValidator:
         
         date_str = str(date_value).strip()
         
-        # Common date patterns
-        patterns = [
-            r'(\d{4})-(\d{1,2})-(\d{1,2})',  # YYYY-MM-DD
-            r'(\d{1,2})/(\d{1,2})/(\d{4})',  # DD/MM/YYYY or MM/DD/YYYY
-            r'(\d{1,2})-(\d{1,2})-(\d{4})',  # DD-MM-YYYY
-            r'(\d{1,2})\.(\d{1,2})\.(\d{4})'  # DD.MM.YYYY
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, date_str)
-            if match:
-                try:
-                    groups = match.groups()
-                    if len(groups) == 3:
-                        # Assume DD/MM/YYYY for ambiguous formats
-                        if pattern.startswith(r'(\d{4})'):  # YYYY-MM-DD
-                            year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
-                        else:  # DD/MM/YYYY format
-                            day, month, year = int(groups[0]), int(groups[1]), int(groups[2])
-                        
-                        parsed_date = date(year, month, day)
-                        return parsed_date.isoformat()
-                except ValueError:
-                    continue
+        for match in DATE_RE.finditer(date_str):
+            try:
+                if match.group('iso_year'):  # YYYY-MM-DD
+                    year, month, day = int(match['iso_year']), int(match['iso_month']), int(match['iso_day'])
+                else:  # Assume DD/MM/YYYY for ambiguous formats
+                    day, month, year = int(match['day']), int(match['month']), int(match['year'])
+                
+                parsed_date = date(year, month, day)
+                return parsed_date.isoformat()
+            except ValueError:
+                continue
         
         return None
     
@@ -248,9 +279,7 @@ class ReceiptDataValidator:
         
         time_str = str(time_value).strip()
         
-        # Common time patterns
-        time_pattern = r'(\d{1,2}):(\d{2})(?::(\d{2}))?'
-        match = re.search(time_pattern, time_str)
+        match = TIME_RE.search(time_str)
         
         if match:
             hour, minute = int(match.group(1)), int(match.group(2))
@@ -278,14 +307,11 @@ class ReceiptDataValidator:
         # Convert to string and clean
         value_str = str(value).strip()
         
-        # Remove currency symbols and spaces
-        for symbol in self.currency_symbols.keys():
-            value_str = value_str.replace(symbol, '')
-        
-        value_str = value_str.replace(' ', '').replace(',', '')
+        # Remove currency symbols, spaces and thousands separators
+        value_str = value_str.translate(self.amount_strip_table)
         
         # Extract number
-        number_match = re.search(r'[\d.]+', value_str)
+        number_match = NUMBER_RE.search(value_str)
         if number_match:
             try:
                 return Decimal(number_match.group())
@@ -307,7 +333,7 @@ class ReceiptDataValidator:
                 return code
         
         # Common currency codes
-        if currency_str in ['GBP', 'USD', 'EUR', 'JPY']:
+        if currency_str in KNOWN_CURRENCY_CODES:
             return currency_str
         
         return 'GBP'  # Default to GBP for UK receipts
@@ -317,7 +343,7 @@ class ReceiptDataValidator:
         if not card_number:
             return ''
         
-        digits = re.sub(r'[^\d]', '', str(card_number))
+        digits = NON_DIGIT_RE.sub('', str(card_number))
         if len(digits) >= 4:
             return digits[-4:]
         
@@ -336,23 +362,7 @@ class ReceiptDataValidator:
         if not category:
             return 'other'
         
-        category_str = str(category).strip().lower()
-        
-        # Direct match
-        valid_categories = [
-            'office_supplies', 'travel', 'meals', 'utilities', 'rent',
-            'software', 'hardware', 'professional_services', 'marketing', 'other'
-        ]
-        
-        if category_str in valid_categories:
-            return category_str
-        
-        # Fuzzy matching
-        for keyword, mapped_category in self.category_mapping.items():
-            if keyword in category_str:
-                return mapped_category
-        
-        return 'other'
+        return map_category(str(category).strip().lower())
     
     def _validate_data_consistency(self, cleaned_data: Dict[str, Any]):
         """Validate data consistency and add warnings/errors."""
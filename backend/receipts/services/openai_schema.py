@@ -43,3 +43,59 @@ UK_RECEIPT_JSON_SCHEMA = {
         }
     }
 }
+
+# Strict structured-output schema for the focused extraction prompt.
+# Strict mode requires every property to be listed as required; optional
+# values are expressed as nullable types instead.
+FOCUSED_RECEIPT_JSON_SCHEMA = {
+    "name": "focused_receipt",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": [
+            "vendor_name", "total_amount", "tax_amount", "transaction_date",
+            "discount_amount", "number_of_items", "transaction_type",
+            "currency", "confidence_score"
+        ],
+        "properties": {
+            "vendor_name": {
+                "type": "string",
+                "description": "Store/business name"
+            },
+            "total_amount": {
+                "type": ["number", "null"],
+                "description": "Final payment amount, no currency symbols"
+            },
+            "tax_amount": {
+                "type": ["number", "null"],
+                "description": "Tax/VAT amount, no currency symbols"
+            },
+            "transaction_date": {
+                "type": ["string", "null"],
+                "description": "Transaction date in YYYY-MM-DD format"
+            },
+            "discount_amount": {
+                "type": ["number", "null"],
+                "description": "Total discounts/savings applied, 0 if none"
+            },
+            "number_of_items": {
+                "type": ["integer", "null"],
+                "description": "Total items purchased"
+            },
+            "transaction_type": {
+                "type": "string",
+                "enum": ["expense", "income"],
+                "description": "expense for purchases, income for refunds"
+            },
+            "currency": {
+                "type": "string",
+                "description": "ISO currency code, e.g. GBP, USD, EUR"
+            },
+            "confidence_score": {
+                "type": "integer",
+                "description": "Extraction confidence on a 1-10 scale"
+            }
+        }
+    }
+}
@@ -0,0 +1,15 @@
+"""
+Signal handlers for the receipts app.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Transaction
+from .utils import invalidate_transaction_summaries
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def clear_transaction_summary_cache(sender, instance, **kwargs):
+    """Keep cached per-user transaction summaries in step with their rows"""
+    invalidate_transaction_summaries(instance.owner_id)
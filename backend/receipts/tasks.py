@@ -0,0 +1,33 @@
+"""
+Celery tasks for background receipt OCR.
+Only used when OCR_USE_CELERY is enabled; otherwise batches run on the web
+process's OCR thread pool.
+"""
+from celery import shared_task
+from django.conf import settings
+
+_http_settings = getattr(settings, 'HTTP_CLIENT_SETTINGS', {})
+
+# Worst case for one vision call: every attempt the SDK makes connects and then
+# waits out the full read timeout. Batches are dispatched one round of API
+# slots at a time, so a task needs about that long plus time for storage reads,
+# the Cloudinary upload and saving the results.
+OCR_TASK_SOFT_TIME_LIMIT = int(
+    (_http_settings.get('connect_timeout', 10.0) + _http_settings.get('read_timeout', 60.0))
+    * (getattr(settings, 'VISION_API_MAX_RETRIES', 3) + 1)
+) + 30
+OCR_TASK_TIME_LIMIT = OCR_TASK_SOFT_TIME_LIMIT + 30
+
+
+@shared_task(soft_time_limit=OCR_TASK_SOFT_TIME_LIMIT, time_limit=OCR_TASK_TIME_LIMIT)
+def process_receipt_task(receipt_id):
+    """Run focused OCR extraction for a single receipt"""
+    from .services.enhanced_openai_service import _process_receipt_batch
+    _process_receipt_batch([receipt_id])
+
+
+@shared_task(soft_time_limit=OCR_TASK_SOFT_TIME_LIMIT, time_limit=OCR_TASK_TIME_LIMIT)
+def batch_process_receipts(receipt_ids, fresh_ids=()):
+    """Run focused OCR extraction for up to OCR_API_CALLS_PER_WORKER receipts queued together"""
+    from .services.enhanced_openai_service import _process_receipt_batch
+    _process_receipt_batch(receipt_ids, fresh_ids)
@@ -1,3 +1,178 @@
-from django.test import TestCase
+import hashlib
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .models import Receipt
+from .services import enhanced_openai_service as ocr
+
+
+IMAGE_BYTES = b'receipt image bytes'
+IMAGE_SHA256 = hashlib.sha256(IMAGE_BYTES).hexdigest()
+
+
+def focused_result(vendor):
+    """A process_receipt_focused answer as returned by the vision API"""
+    return {
+        'vendor_name': vendor,
+        'total_amount': 12.5,
+        'transaction_date': '2024-01-02',
+        'tax_amount': None,
+        'currency': 'GBP',
+        'transaction_type': 'expense',
+        'line_items': [],
+        'processing_metadata': {'input_tokens': 100, 'cost_usd': 0.001},
+    }
+
+
+class ReceiptFixtureMixin:
+    """An owner with one completed receipt, and an API client logged in as them"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='owner@example.com', username='owner', password='pw',
+            first_name='Owner', last_name='Test',
+        )
+        self.receipt = Receipt.objects.create(
+            owner=self.user,
+            file=ContentFile(IMAGE_BYTES, name='receipt.jpg'),
+            original_filename='receipt.jpg',
+            content_sha256=IMAGE_SHA256,
+            ocr_status=Receipt.COMPLETED,
+            extracted_data={'vendor': 'Old Vendor'},
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReprocessViewTests(ReceiptFixtureMixin, TransactionTestCase):
+    # Real commits, so on_commit callbacks run exactly when they would in a request
+
+    def test_reprocess_queues_receipt_past_the_cache(self):
+        statuses = []
+        
+        def enqueue_side_effect(receipt_id, fresh):
+            # The view's own writes must already be saved when the job is buffered
+            statuses.append((Receipt.objects.get(id=receipt_id).processing_metadata or {}).get('status'))
+        
+        with mock.patch.object(ocr, '_enqueue_receipt', side_effect=enqueue_side_effect) as enqueue:
+            response = self.client.post(f'/api/v1/receipts/{self.receipt.id}/reprocess/')
+        
+        self.assertEqual(response.status_code, 200)
+        enqueue.assert_called_once_with(self.receipt.id, True)
+        self.assertEqual(statuses, ['queued'])
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.ocr_status, 'processing')
+
+
+@override_settings(VISION_API_ENABLE_CACHING=True, OCR_API_CALLS_PER_WORKER=4)
+class ProcessReceiptBatchTests(ReceiptFixtureMixin, TestCase):
+    @mock.patch.object(ocr, '_get_worker_service')
+    def test_fresh_receipt_gets_a_new_extraction(self, get_service):
+        ocr._cache_results({IMAGE_SHA256: focused_result('Old Vendor')})
+        get_service.return_value.process_receipt_focused = mock.AsyncMock(
+            return_value=focused_result('New Vendor')
+        )
+        ocr._process_receipt_batch([self.receipt.id], [self.receipt.id])
+        
+        get_service.return_value.process_receipt_focused.assert_awaited_once()
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.extracted_data['vendor'], 'New Vendor')
+        self.assertEqual(self.receipt.ocr_status, Receipt.COMPLETED)
+
+    @mock.patch.object(ocr, '_get_worker_service')
+    def test_reupload_does_not_copy_an_errored_extraction(self, get_service):
+        Receipt.objects.filter(id=self.receipt.id).update(
+            processing_metadata={'error': 'Vision API timed out'}
+        )
+        reupload = Receipt.objects.create(
+            owner=self.user,
+            file=ContentFile(IMAGE_BYTES, name='receipt.jpg'),
+            original_filename='receipt.jpg',
+            content_sha256=IMAGE_SHA256,
+            ocr_status='processing',
+        )
+        get_service.return_value.process_receipt_focused = mock.AsyncMock(
+            return_value=focused_result('New Vendor')
+        )
+        
+        ocr._process_receipt_batch([reupload.id])
+        
+        get_service.return_value.process_receipt_focused.assert_awaited_once()
+        reupload.refresh_from_db()
+        self.assertEqual(reupload.extracted_data['vendor'], 'New Vendor')
+        self.assertNotIn('duplicate_of', reupload.processing_metadata)
+
+    @mock.patch.object(ocr, '_get_worker_service')
+    def test_reupload_does_not_copy_a_zero_token_fallback(self, get_service):
+        # What _get_default_extraction is saved as when the vision call fails
+        Receipt.objects.filter(id=self.receipt.id).update(
+            extracted_data={'vendor': 'Unknown', 'total': 0},
+            processing_metadata={'input_tokens': 0, 'output_tokens': 0, 'confidence_score': 1},
+        )
+        reupload = Receipt.objects.create(
+            owner=self.user,
+            file=ContentFile(IMAGE_BYTES, name='receipt.jpg'),
+            original_filename='receipt.jpg',
+            content_sha256=IMAGE_SHA256,
+            ocr_status='processing',
+        )
+        get_service.return_value.process_receipt_focused = mock.AsyncMock(
+            return_value=focused_result('New Vendor')
+        )
+        
+        ocr._process_receipt_batch([reupload.id])
+        
+        get_service.return_value.process_receipt_focused.assert_awaited_once()
+        reupload.refresh_from_db()
+        self.assertEqual(reupload.extracted_data['vendor'], 'New Vendor')
+        self.assertNotIn('duplicate_of', reupload.processing_metadata)
+
+    @mock.patch.object(ocr, '_get_worker_service')
+    def test_reupload_copies_a_successful_extraction(self, get_service):
+        Receipt.objects.filter(id=self.receipt.id).update(
+            processing_metadata={'input_tokens': 100, 'cost_usd': 0.001},
+        )
+        reupload = Receipt.objects.create(
+            owner=self.user,
+            file=ContentFile(IMAGE_BYTES, name='receipt.jpg'),
+            original_filename='receipt.jpg',
+            content_sha256=IMAGE_SHA256,
+            ocr_status='processing',
+        )
+        
+        ocr._process_receipt_batch([reupload.id])
+        
+        get_service.return_value.process_receipt_focused.assert_not_called()
+        reupload.refresh_from_db()
+        self.assertEqual(reupload.extracted_data['vendor'], 'Old Vendor')
+        self.assertEqual(reupload.processing_metadata['duplicate_of'], self.receipt.id)
+
+    @mock.patch.object(ocr, '_get_worker_service', side_effect=RuntimeError('no API key'))
+    def test_batch_failure_marks_receipts_failed(self, get_service):
+        Receipt.objects.filter(id=self.receipt.id).update(ocr_status='processing')
+        
+        ocr._process_receipt_batch([self.receipt.id], [self.receipt.id])
+        
+        self.receipt.refresh_from_db()
+        self.assertEqual(self.receipt.ocr_status, Receipt.FAILED)
+
+
+class BatchConnectionTests(SimpleTestCase):
+    @mock.patch.object(ocr, '_run_receipt_batch', side_effect=RuntimeError('boom'))
+    @mock.patch.object(ocr, 'close_old_connections')
+    @mock.patch.object(ocr, 'connection')
+    def test_pool_thread_recycles_its_connection(self, connection, close_old, run_batch):
+        connection.in_atomic_block = False
+        
+        with self.assertRaises(RuntimeError):
+            ocr._process_receipt_batch([1])
+        
+        close_old.assert_called_once_with()
+        connection.close.assert_called_once_with()
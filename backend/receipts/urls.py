@@ -1,10 +1,10 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import SimpleRouter
 
 from .views import ReceiptViewSet, TransactionViewSet
 
 # Create a router for ViewSets
-router = DefaultRouter()
+router = SimpleRouter()
 router.register(r'', ReceiptViewSet, basename='receipt')  # Remove 'receipts' prefix
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 
@@ -1,10 +1,34 @@
 """
 Utilities for receipt processing and JSON serialization.
 """
+import hashlib
 import json
+import logging
 from decimal import Decimal
 from datetime import datetime, date
 
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Per-user cache of TransactionViewSet.by_type, dropped whenever one of the
+# user's transactions changes
+TRANSACTIONS_BY_TYPE_CACHE_TIMEOUT = 3600
+
+
+def transactions_by_type_cache_key(owner_id):
+    """Cache key for a user's transaction totals grouped by type."""
+    return f"transactions_by_type:{owner_id}"
+
+
+def invalidate_transaction_summaries(owner_id):
+    """Drop a user's cached transaction summaries after their transactions change."""
+    # A cache outage must not fail the write that triggered this
+    try:
+        cache.delete(transactions_by_type_cache_key(owner_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached transaction summaries for user {owner_id}: {e}")
+
 
 class DecimalEncoder(json.JSONEncoder):
     """
@@ -19,36 +43,63 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+def compute_file_sha256(file_obj, chunk_size=64 * 1024):
+    """
+    Hash an uploaded or stored file in fixed-size chunks rather than reading it
+    into memory whole. The file is left positioned at the start.
+    """
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks(chunk_size):
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
 def safe_decimal_to_float(value, default=0.0):
     """
     Safely convert Decimal or numeric value to float.
+    
+    Its only caller is normalize_processing_metadata, which nothing calls.
     """
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is int or value_type is Decimal:
+        return float(value)
     if value is None:
         return default
+    # Strings and other types may not parse
     try:
-        if isinstance(value, Decimal):
-            return float(value)
         return float(value)
     except (TypeError, ValueError):
         return default
 
 
+# Numeric fields coerced to float by normalize_extracted_data
+_NUMERIC_FIELDS = ('total', 'tax', 'subtotal', 'discount')
+
+
 def normalize_extracted_data(data):
     """
     Normalize extracted data to ensure all numeric fields are float.
     Used for new schema consistency.
+    
+    Nothing calls this at present: serializers.py imports it but never uses it.
     """
     if not isinstance(data, dict):
         return data
     
     # Create a copy to avoid modifying original
-    normalized = data.copy()
+    normalized = dict(data)
     
-    # Convert known numeric fields
-    numeric_fields = ['total', 'tax', 'subtotal', 'discount']
-    for field in numeric_fields:
+    # Convert known numeric fields inline; None and unparseable values become 0.0
+    for field in _NUMERIC_FIELDS:
         if field in normalized:
-            normalized[field] = safe_decimal_to_float(normalized[field])
+            value = normalized[field]
+            try:
+                normalized[field] = float(value) if value is not None else 0.0
+            except (TypeError, ValueError):
+                normalized[field] = 0.0
     
     # Ensure required fields have defaults for new schema
     normalized.setdefault('vendor', 'Unknown Vendor')
@@ -61,6 +112,15 @@ def normalize_extracted_data(data):
     return normalized
 
 
+# Schema rules for validate_new_schema, built once at import
+_REQUIRED_FIELDS = ('vendor', 'date', 'total', 'type')
+_SCHEMA_CHECKS = (
+    ('vendor', lambda value: isinstance(value, str), "vendor must be a string"),
+    ('total', lambda value: isinstance(value, (int, float, Decimal)), "total must be numeric"),
+    ('type', lambda value: value in ('expense', 'income'), "type must be 'expense' or 'income'"),
+)
+
+
 def validate_new_schema(extracted_data):
     """
     Validate that extracted data follows the new flat schema structure.
@@ -74,25 +134,19 @@ def validate_new_schema(extracted_data):
         "type": "expense" or "income",
         "currency": "string"
     }
+    
+    Nothing calls this at present.
     """
     if not isinstance(extracted_data, dict):
         return False, "Extracted data must be a dictionary"
     
-    required_fields = ['vendor', 'date', 'total', 'type']
-    missing_fields = [field for field in required_fields if field not in extracted_data]
-    
+    missing_fields = [field for field in _REQUIRED_FIELDS if field not in extracted_data]
     if missing_fields:
         return False, f"Missing required fields: {', '.join(missing_fields)}"
     
-    # Validate data types
-    validations = [
-        (isinstance(extracted_data['vendor'], str), "vendor must be a string"),
-        (isinstance(extracted_data['total'], (int, float, Decimal)), "total must be numeric"),
-        (extracted_data['type'] in ['expense', 'income'], "type must be 'expense' or 'income'"),
-    ]
-    
-    for is_valid, error_msg in validations:
-        if not is_valid:
+    # Validate data types, stopping at the first failure
+    for field, is_valid, error_msg in _SCHEMA_CHECKS:
+        if not is_valid(extracted_data[field]):
             return False, error_msg
     
     return True, "Schema is valid"
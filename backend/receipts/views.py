@@ -1,14 +1,15 @@
-import asyncio
 import json
 import logging
 import tempfile
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.db import transaction
 from django.db.models import Q, Sum, Avg, Count
 from django.http import JsonResponse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.cache import never_cache
@@ -21,10 +22,19 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Receipt, Transaction
 from .serializers import ReceiptSerializer, TransactionSerializer
 from .services.enhanced_openai_service import EnhancedOpenAIVisionService
-from .utils import DecimalEncoder
+from .utils import (
+    DecimalEncoder, compute_file_sha256, invalidate_transaction_summaries,
+    transactions_by_type_cache_key, TRANSACTIONS_BY_TYPE_CACHE_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
+# Content types the upload endpoint accepts, checked on every upload
+UPLOAD_CONTENT_TYPES = ('image/jpeg', 'image/jpg', 'image/png', 'image/webp')
+ALLOWED_UPLOAD_CONTENT_TYPES = frozenset(UPLOAD_CONTENT_TYPES)
+INVALID_UPLOAD_TYPE_MESSAGE = f'Invalid file type. Allowed: {", ".join(UPLOAD_CONTENT_TYPES)}'
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+
 # Initialize Enhanced OpenAI service
 enhanced_openai_service = None
 
@@ -111,15 +121,20 @@ class ReceiptViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return receipts for the authenticated user, ordered by newest first"""
-        queryset = Receipt.objects.filter(owner=self.request.user).order_by('-uploaded_at')
-        logger.info(f"ReceiptViewSet.get_queryset: Found {queryset.count()} receipts for user {self.request.user.id}")
-        return queryset
+        # The serializer nests each receipt's transaction; join it rather than
+        # querying per row
+        return (
+            Receipt.objects.filter(owner=self.request.user)
+            .select_related('transaction')
+            .order_by('-uploaded_at')
+        )
 
     def list(self, request, *args, **kwargs):
         """Override list to add debug logging"""
         logger.info(f"ReceiptViewSet.list called by user {request.user.id}")
-        queryset = self.get_queryset()
-        logger.info(f"ReceiptViewSet.list: Queryset has {queryset.count()} receipts")
+        # Evaluate once; the count, the debug lines and the serializer share the rows
+        queryset = list(self.get_queryset())
+        logger.info(f"ReceiptViewSet.list: Queryset has {len(queryset)} receipts")
         
         # Add detailed logging for each receipt
         for receipt in queryset[:5]:  # Log first 5 receipts
@@ -154,21 +169,21 @@ class ReceiptViewSet(viewsets.ModelViewSet):
                 )
 
             image_file = request.FILES['image']
+            image_size = image_file.size
             description = getattr(request, 'data', {}).get('description', '') or request.POST.get('description', '')
-            logger.info(f"Processing upload for file: {image_file.name}, size: {image_file.size}")
+            logger.info(f"Processing upload for file: {image_file.name}, size: {image_size}")
 
             # Validate file type
-            allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
-            if image_file.content_type not in allowed_types:
+            if image_file.content_type not in ALLOWED_UPLOAD_CONTENT_TYPES:
                 logger.error(f"Invalid file type: {image_file.content_type}")
                 return Response(
-                    {'error': f'Invalid file type. Allowed: {", ".join(allowed_types)}'},
+                    {'error': INVALID_UPLOAD_TYPE_MESSAGE},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             # Validate file size (10MB limit)
-            if image_file.size > 10 * 1024 * 1024:
-                logger.error(f"File too large: {image_file.size}")
+            if image_size > MAX_UPLOAD_SIZE:
+                logger.error(f"File too large: {image_size}")
                 return Response(
                     {'error': 'File too large. Maximum size: 10MB'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -181,6 +196,7 @@ class ReceiptViewSet(viewsets.ModelViewSet):
                     owner=request.user,
                     file=image_file,  # Keep local storage as backup
                     original_filename=image_file.name,
+                    content_sha256=compute_file_sha256(image_file),
                     ocr_status='processing'
                 )
                 logger.info(f"Receipt record created with ID: {receipt.id}")
@@ -191,138 +207,62 @@ class ReceiptViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-            receipt.save()
-
             # Process with Celery background task (ASYNC) or fallback to sync
+            # (the receipt was created with ocr_status 'processing')
             from .services.enhanced_openai_service import queue_ocr_task
             
-            # Set initial status to processing
-            receipt.ocr_status = 'processing'
-            receipt.save()
-            
             logger.info(f"About to queue OCR task for receipt {receipt.id}")
             
-            # Try to queue the task safely
-            queue_result = queue_ocr_task(receipt.id)
-            
-            logger.info(f"Queue result for receipt {receipt.id}: {queue_result}")
-            
-            if queue_result["queued"]:
-                # Successfully queued (either async or eager)
-                receipt.processing_metadata = {
-                    'status': 'queued',
-                    'queued_at': datetime.now().isoformat(),
-                    'processing_method': 'eager' if queue_result.get('eager') else 'async',
-                    'task_id': queue_result.get('task_id')
-                }
-                receipt.save()
-                
-                logger.info(f"✅ Queued OCR processing for receipt {receipt.id} (method: {receipt.processing_metadata['processing_method']})")
-                
-            elif queue_result.get("deferred"):
-                # Queue unavailable, return 202 for client retry
-                receipt.ocr_status = 'queued'
-                receipt.processing_metadata = {
-                    'status': 'deferred',
-                    'queued_at': datetime.now().isoformat(),
-                    'message': 'Queue busy, will retry automatically'
-                }
-                receipt.save()
-                
-                logger.info(f"Queue deferred for receipt {receipt.id}, returning 202")
-                serializer = self.get_serializer(receipt)
-                return Response({
-                    **serializer.data,
-                    "queued": False, 
-                    "detail": "Queue busy, processing will retry automatically."
-                }, status=status.HTTP_202_ACCEPTED)
+            # The OCR job is only buffered once this block commits, so the status
+            # writes below land first and cannot overwrite the worker's result
+            with transaction.atomic():
+                # Try to queue the task safely
+                queue_result = queue_ocr_task(receipt.id)
                 
-            else:
-                # Queue error, fallback to synchronous processing
-                logger.error(f"❌ Queue failed for receipt {receipt.id}: {queue_result.get('error', 'Unknown error')}")
-                logger.warning(f"Attempting synchronous fallback for receipt {receipt.id}")
+                logger.info(f"Queue result for receipt {receipt.id}: {queue_result}")
                 
-                # Fallback to synchronous processing when Celery is unavailable
-                try:
-                    # Process receipt synchronously using asyncio
-                    service = get_enhanced_openai_service()
+                if queue_result["queued"]:
+                    # Successfully queued (either async or eager)
+                    receipt.processing_metadata = {
+                        'status': 'queued',
+                        'queued_at': datetime.now().isoformat(),
+                        'processing_method': 'eager' if queue_result.get('eager') else 'async',
+                        'task_id': queue_result.get('task_id')
+                    }
+                    receipt.save(update_fields=['processing_metadata', 'updated_at'])
                     
-                    # Check if we're in test mode (OpenAI service disabled)
-                    if service.async_client is None:
-                        # In test mode, create mock result
-                        result = {
-                            'vendor_name': 'Test Vendor',
-                            'total_amount': 10.00,
-                            'transaction_type': 'expense',
-                            'date': datetime.now().date().isoformat(),
-                            'currency': 'GBP',
-                            'processing_metadata': {
-                                'processing_method': 'test_mode',
-                                'processing_time': 0.1,
-                                'cost_usd': 0.00
-                            }
-                        }
-                        logger.info(f"Test mode: created mock result for receipt {receipt.id}")
-                    else:
-                        # Define async processing function
-                        async def process_sync():
-                            # Use the local file for processing (Cloudinary is just for display)
-                            return await service.process_receipt_focused(receipt.file, receipt.original_filename)
-                        
-                        # Run the async processing
-                        result = asyncio.run(process_sync())
+                    logger.info(f"✅ Queued OCR processing for receipt {receipt.id} (method: {receipt.processing_metadata['processing_method']})")
                     
-                    # Update receipt with extracted data
-                    if result:
-                        receipt.extracted_data = result
-                        receipt.ocr_status = 'completed'
-                        receipt.processing_metadata = result.get('processing_metadata', {})
-                        receipt.processing_metadata['processing_method'] = 'synchronous_fallback'
-                        
-                        # CRITICAL FIX: Save Cloudinary URLs to Receipt model fields
-                        cloudinary_data = result.get('processing_metadata', {}).get('cloudinary', {})
-                        if cloudinary_data:
-                            receipt.cloudinary_public_id = cloudinary_data.get('public_id')
-                            receipt.cloudinary_url = cloudinary_data.get('secure_url')
-                            receipt.cloudinary_display_url = cloudinary_data.get('display_url', cloudinary_data.get('secure_url'))
-                            receipt.cloudinary_thumbnail_url = cloudinary_data.get('thumbnail_url', cloudinary_data.get('secure_url'))
-                            receipt.image_width = cloudinary_data.get('width')
-                            receipt.image_height = cloudinary_data.get('height')
-                            receipt.file_size_bytes = cloudinary_data.get('bytes')
-                            logger.info(f"Synchronous: Saved Cloudinary URLs to receipt {receipt.id}: display={receipt.cloudinary_display_url}, thumbnail={receipt.cloudinary_thumbnail_url}")
-                        
-                        # Create transaction if we have valid data
-                        if result.get('vendor_name') and result.get('total_amount'):
-                            try:
-                                Transaction.objects.create(
-                                    receipt=receipt,
-                                    owner=request.user,
-                                    total_amount=Decimal(str(result.get('total_amount', 0))),
-                                    transaction_type=result.get('transaction_type', 'expense'),
-                                    vendor_name=result.get('vendor_name', 'Unknown'),
-                                    transaction_date=self._parse_date(result.get('date'))
-                                )
-                                logger.info(f"Created transaction for receipt {receipt.id}")
-                            except Exception as tx_error:
-                                logger.warning(f"Could not create transaction for receipt {receipt.id}: {tx_error}")
-                    else:
-                        receipt.ocr_status = 'failed'
-                        receipt.processing_metadata = {
-                            'error': 'Synchronous processing failed',
-                            'processing_method': 'synchronous_fallback'
-                        }
+                elif queue_result.get("deferred"):
+                    # Queue unavailable, return 202 for client retry
+                    receipt.ocr_status = 'queued'
+                    receipt.processing_metadata = {
+                        'status': 'deferred',
+                        'queued_at': datetime.now().isoformat(),
+                        'message': 'Queue busy, will retry automatically'
+                    }
+                    receipt.save(update_fields=['ocr_status', 'processing_metadata', 'updated_at'])
                     
-                    receipt.save()
+                    logger.info(f"Queue deferred for receipt {receipt.id}, returning 202")
+                    serializer = self.get_serializer(receipt)
+                    return Response({
+                        **serializer.data,
+                        "queued": False, 
+                        "detail": "Queue busy, processing will retry automatically."
+                    }, status=status.HTTP_202_ACCEPTED)
                     
-                except Exception as sync_error:
-                    logger.error(f"Synchronous processing also failed for receipt {receipt.id}: {sync_error}")
+                else:
+                    # Queue error: record it instead of running OCR on the request
+                    # thread; the receipt can be reprocessed once queueing works again
+                    error = queue_result.get('error', 'Unknown error')
+                    logger.error(f"❌ Queue failed for receipt {receipt.id}: {error}")
                     receipt.ocr_status = 'failed'
                     receipt.processing_metadata = {
-                        'error': f'Both async and sync processing failed: {str(sync_error)}',
-                        'processing_method': 'failed_fallback'
+                        'error': f'Could not queue OCR processing: {error}',
+                        'processing_method': 'queue_failed'
                     }
-                    receipt.save()
-            
+                    receipt.save(update_fields=['ocr_status', 'processing_metadata', 'updated_at'])
+                
             # Always return success if receipt was uploaded and stored
             serializer = self.get_serializer(receipt)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -382,146 +322,61 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         receipt.ocr_status = 'processing'
         receipt.extracted_data = {}
         
-        # Try to queue the reprocessing task safely
-        queue_result = queue_ocr_task(receipt.id)
-        
-        if queue_result["queued"]:
-            # Successfully queued (either async or eager)
-            receipt.processing_metadata = {
-                'status': 'queued',
-                'queued_at': datetime.now().isoformat(),
-                'reprocessed': True,
-                'processing_method': 'eager' if queue_result.get('eager') else 'async'
-            }
-            receipt.save()
-            
-            logger.info(f"Queued reprocessing for receipt {receipt.id} (method: {receipt.processing_metadata['processing_method']})")
-            serializer = self.get_serializer(receipt)
-            return Response(serializer.data)
-            
-        elif queue_result.get("deferred"):
-            # Queue unavailable, return 202 for client retry
-            receipt.ocr_status = 'queued'
-            receipt.processing_metadata = {
-                'status': 'deferred',
-                'queued_at': datetime.now().isoformat(),
-                'reprocessed': True,
-                'message': 'Queue busy, will retry automatically'
-            }
-            receipt.save()
-            
-            logger.info(f"Reprocessing queue deferred for receipt {receipt.id}, returning 202")
-            serializer = self.get_serializer(receipt)
-            return Response({
-                **serializer.data,
-                "queued": False, 
-                "detail": "Queue busy, reprocessing will retry automatically."
-            }, status=status.HTTP_202_ACCEPTED)
-            
-        else:
-            # Queue error, fallback to synchronous processing
-            logger.warning(f"Reprocessing queue failed for receipt {receipt.id}, attempting synchronous fallback")
+        # The OCR job is only buffered once this block commits, so the status
+        # writes below land first and cannot overwrite the worker's result
+        with transaction.atomic():
+            # Try to queue the reprocessing task safely; a reprocess must not be
+            # answered from the OCR cache with the result being replaced
+            queue_result = queue_ocr_task(receipt.id, fresh=True)
             
-            # Fallback to synchronous processing when Celery is unavailable
-            try:
-                # Process receipt synchronously using asyncio
-                service = get_enhanced_openai_service()
+            if queue_result["queued"]:
+                # Successfully queued (either async or eager)
+                receipt.processing_metadata = {
+                    'status': 'queued',
+                    'queued_at': datetime.now().isoformat(),
+                    'reprocessed': True,
+                    'processing_method': 'eager' if queue_result.get('eager') else 'async'
+                }
+                receipt.save(update_fields=['ocr_status', 'extracted_data', 'processing_metadata', 'updated_at'])
                 
-                # Check if we're in test mode (OpenAI service disabled)
-                if service.async_client is None:
-                    # In test mode, create mock result
-                    result = {
-                        'vendor_name': 'Test Vendor',
-                        'total_amount': 10.00,
-                        'transaction_type': 'expense',
-                        'date': datetime.now().date().isoformat(),
-                        'currency': 'GBP',
-                        'processing_metadata': {
-                            'processing_method': 'test_mode',
-                            'processing_time': 0.1,
-                            'cost_usd': 0.00,
-                            'reprocessed': True
-                        }
-                    }
-                    logger.info(f"Test mode: created mock result for reprocessing receipt {receipt.id}")
-                else:
-                    # Define async processing function
-                    async def process_sync():
-                        # Use the local file for processing (Cloudinary is just for display)
-                        return await service.process_receipt_focused(receipt.file, receipt.original_filename)
-                    
-                    # Run the async processing
-                    result = asyncio.run(process_sync())
+                logger.info(f"Queued reprocessing for receipt {receipt.id} (method: {receipt.processing_metadata['processing_method']})")
+                serializer = self.get_serializer(receipt)
+                return Response(serializer.data)
                 
-                # Update receipt with extracted data
-                if result:
-                    receipt.extracted_data = result
-                    receipt.ocr_status = 'completed'
-                    receipt.processing_metadata = result.get('processing_metadata', {})
-                    receipt.processing_metadata['processing_method'] = 'synchronous_fallback'
-                    receipt.processing_metadata['reprocessed'] = True
-                    
-                    # CRITICAL FIX: Save Cloudinary URLs to Receipt model fields
-                    cloudinary_data = result.get('processing_metadata', {}).get('cloudinary', {})
-                    if cloudinary_data:
-                        receipt.cloudinary_public_id = cloudinary_data.get('public_id')
-                        receipt.cloudinary_url = cloudinary_data.get('secure_url')
-                        receipt.cloudinary_display_url = cloudinary_data.get('display_url', cloudinary_data.get('secure_url'))
-                        receipt.cloudinary_thumbnail_url = cloudinary_data.get('thumbnail_url', cloudinary_data.get('secure_url'))
-                        receipt.image_width = cloudinary_data.get('width')
-                        receipt.image_height = cloudinary_data.get('height')
-                        receipt.file_size_bytes = cloudinary_data.get('bytes')
-                        logger.info(f"Reprocess: Saved Cloudinary URLs to receipt {receipt.id}: display={receipt.cloudinary_display_url}, thumbnail={receipt.cloudinary_thumbnail_url}")
-                    
-                    # Create or update transaction if we have valid data
-                    if result.get('vendor_name') and result.get('total_amount'):
-                        try:
-                            # Try to get existing transaction first
-                            try:
-                                transaction = Transaction.objects.get(receipt=receipt)
-                                transaction.total_amount = Decimal(str(result.get('total_amount', 0)))
-                                transaction.transaction_type = result.get('transaction_type', 'expense')
-                                transaction.vendor_name = result.get('vendor_name', 'Unknown')
-                                transaction.transaction_date = self._parse_date(result.get('date'))
-                                transaction.save()
-                                logger.info(f"Updated transaction for receipt {receipt.id}")
-                            except Transaction.DoesNotExist:
-                                Transaction.objects.create(
-                                    receipt=receipt,
-                                    owner=self.request.user,
-                                    total_amount=Decimal(str(result.get('total_amount', 0))),
-                                    transaction_type=result.get('transaction_type', 'expense'),
-                                    vendor_name=result.get('vendor_name', 'Unknown'),
-                                    transaction_date=self._parse_date(result.get('date'))
-                                )
-                                logger.info(f"Created transaction for receipt {receipt.id}")
-                        except Exception as tx_error:
-                            logger.warning(f"Could not create/update transaction for receipt {receipt.id}: {tx_error}")
-                else:
-                    receipt.ocr_status = 'failed'
-                    receipt.processing_metadata = {
-                        'error': 'Synchronous reprocessing failed',
-                        'processing_method': 'synchronous_fallback',
-                        'reprocessed': True
-                    }
+            elif queue_result.get("deferred"):
+                # Queue unavailable, return 202 for client retry
+                receipt.ocr_status = 'queued'
+                receipt.processing_metadata = {
+                    'status': 'deferred',
+                    'queued_at': datetime.now().isoformat(),
+                    'reprocessed': True,
+                    'message': 'Queue busy, will retry automatically'
+                }
+                receipt.save(update_fields=['ocr_status', 'extracted_data', 'processing_metadata', 'updated_at'])
                 
-                receipt.save()
+                logger.info(f"Reprocessing queue deferred for receipt {receipt.id}, returning 202")
                 serializer = self.get_serializer(receipt)
-                return Response(serializer.data)
+                return Response({
+                    **serializer.data,
+                    "queued": False, 
+                    "detail": "Queue busy, reprocessing will retry automatically."
+                }, status=status.HTTP_202_ACCEPTED)
                 
-            except Exception as sync_error:
-                logger.error(f"Synchronous reprocessing also failed for receipt {receipt.id}: {sync_error}")
+            else:
+                # Queue error: record it instead of running OCR on the request thread
+                error = queue_result.get('error', 'Unknown error')
+                logger.error(f"Reprocessing queue failed for receipt {receipt.id}: {error}")
                 receipt.ocr_status = 'failed'
                 receipt.processing_metadata = {
-                    'error': f'Both async and sync reprocessing failed: {str(sync_error)}',
-                    'processing_method': 'failed_fallback',
+                    'error': f'Could not queue OCR reprocessing: {error}',
+                    'processing_method': 'queue_failed',
                     'reprocessed': True
                 }
-                receipt.save()
+                receipt.save(update_fields=['ocr_status', 'extracted_data', 'processing_metadata', 'updated_at'])
                 
                 return Response(
-                    {'error': f'Reprocessing failed: {str(sync_error)}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    {'error': f'Reprocessing failed: {error}'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
 
     @action(detail=True, methods=['patch'])
@@ -551,29 +406,34 @@ class ReceiptViewSet(viewsets.ModelViewSet):
                 new_value = request.data[field]
                 receipt.extracted_data[field] = new_value
         
-        receipt.save()
+        receipt.save(update_fields=['extracted_data', 'updated_at'])
 
         # Update associated transaction if total changed
         if 'total' in request.data or 'type' in request.data or 'vendor' in request.data or 'date' in request.data or 'category' in request.data:
             try:
-                transaction = Transaction.objects.get(receipt=receipt)
-                
+                changes = {}
                 if 'total' in request.data:
-                    transaction.total_amount = Decimal(str(request.data['total']))
+                    changes['total_amount'] = Decimal(str(request.data['total']))
                 if 'type' in request.data:
-                    transaction.transaction_type = request.data['type']
+                    changes['transaction_type'] = request.data['type']
                 if 'vendor' in request.data:
-                    transaction.vendor_name = request.data['vendor']
+                    changes['vendor_name'] = request.data['vendor']
                 if 'date' in request.data:
-                    transaction.transaction_date = self._parse_date(request.data['date'])
+                    changes['transaction_date'] = self._parse_date(request.data['date'])
                 if 'category' in request.data:
-                    transaction.category = request.data['category']
+                    changes['category'] = request.data['category']
+                
+                # One UPDATE; a zero row count means there is no transaction yet
+                updated = Transaction.objects.filter(receipt=receipt).update(
+                    updated_at=timezone.now(), **changes
+                )
+                if updated:
+                    # update() sends no post_save, so clear the summaries here
+                    invalidate_transaction_summaries(receipt.owner_id)
                 
-                transaction.save()
-            except Transaction.DoesNotExist:
                 # Create new transaction if it doesn't exist
                 extracted_data = receipt.extracted_data
-                if extracted_data.get('total'):
+                if not updated and extracted_data.get('total'):
                     Transaction.objects.create(
                         receipt=receipt,
                         owner=request.user,
@@ -595,22 +455,26 @@ class ReceiptViewSet(viewsets.ModelViewSet):
         """
         receipts = self.get_queryset()
         
-        # Basic counts
-        total_receipts = receipts.count()
-        processed_receipts = receipts.filter(ocr_status='completed').count()
-        failed_receipts = receipts.filter(ocr_status='failed').count()
+        # Basic counts, in one pass over the user's receipts
+        receipt_counts = receipts.aggregate(
+            total=Count('id'),
+            processed=Count('id', filter=Q(ocr_status='completed')),
+            failed=Count('id', filter=Q(ocr_status='failed')),
+        )
+        total_receipts = receipt_counts['total']
+        processed_receipts = receipt_counts['processed']
+        failed_receipts = receipt_counts['failed']
         
-        # Financial summary from transactions
+        # Financial summary from transactions, also in one pass
         transactions = Transaction.objects.filter(owner=request.user)
-        total_expenses = transactions.filter(transaction_type='expense').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0')
-        
-        total_income = transactions.filter(transaction_type='income').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0')
-        
-        avg_amount = transactions.aggregate(avg=Avg('total_amount'))['avg'] or Decimal('0')
+        totals = transactions.aggregate(
+            expenses=Sum('total_amount', filter=Q(transaction_type='expense')),
+            income=Sum('total_amount', filter=Q(transaction_type='income')),
+            avg=Avg('total_amount'),
+        )
+        total_expenses = totals['expenses'] or Decimal('0')
+        total_income = totals['income'] or Decimal('0')
+        avg_amount = totals['avg'] or Decimal('0')
         
         # Category breakdown
         category_stats = transactions.values('vendor_name').annotate(
@@ -652,14 +516,13 @@ class ReceiptViewSet(viewsets.ModelViewSet):
             # Get user's transactions
             transactions = Transaction.objects.filter(receipt__owner=request.user)
             
-            # Calculate totals
-            total_expenses = transactions.filter(
-                transaction_type='expense'
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            total_income = transactions.filter(
-                transaction_type='income'
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
+            # Calculate totals in one aggregate query
+            totals = transactions.aggregate(
+                expenses=Sum('total_amount', filter=Q(transaction_type='expense')),
+                income=Sum('total_amount', filter=Q(transaction_type='income')),
+            )
+            total_expenses = totals['expenses'] or 0
+            total_income = totals['income'] or 0
             
             # Recent activity
             recent_receipts = receipts[:5]
@@ -756,8 +619,8 @@ class TransactionViewSet(viewsets.ModelViewSet):
         # Group by merchant
         merchants = transactions.values('vendor_name').annotate(
             count=Count('id'),
-            total_amount=Sum('total_amount'),
-            avg_amount=Avg('total_amount')
+            avg_amount=Avg('total_amount'),
+            total_amount=Sum('total_amount')
         ).order_by('-total_amount')
         
         return Response(list(merchants))
@@ -765,16 +628,35 @@ class TransactionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_type(self, request):
         """Get transactions grouped by type (expense/income)"""
+        # Served from the per-user cache until one of the user's transactions changes
+        # A cache outage is treated as a miss rather than failing the request
+        cache_key = transactions_by_type_cache_key(request.user.id)
+        try:
+            types = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Transaction summary cache lookup failed: {e}")
+            types = None
+        if types is not None:
+            return Response(types)
+        
         transactions = self.get_queryset()
         
-        # Group by type
+        # Group by type; replace the date ordering, which would otherwise be
+        # added to the GROUP BY and split each type into one row per date.
+        # avg_amount comes first so it averages the column, not the
+        # total_amount annotation that shadows it
         types = transactions.values('transaction_type').annotate(
             count=Count('id'),
-            total_amount=Sum('total_amount'),
-            avg_amount=Avg('total_amount')
-        )
+            avg_amount=Avg('total_amount'),
+            total_amount=Sum('total_amount')
+        ).order_by('transaction_type')
+        types = list(types)
+        try:
+            cache.set(cache_key, types, TRANSACTIONS_BY_TYPE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Transaction summary cache store failed: {e}")
         
-        return Response(list(types))
+        return Response(types)
 
     @action(detail=False, methods=['get'])
     def monthly_summary(self, request):
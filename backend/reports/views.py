@@ -740,10 +740,18 @@ def audit_log_report(request):
         if status_filter:
             receipts = receipts.filter(ocr_status=status_filter)
         
+        # Fetch every receipt's transaction in one query; receipts without one
+        # are simply absent from the map
+        transactions_by_receipt = {
+            transaction.receipt_id: transaction
+            for transaction in Transaction.objects.filter(receipt__in=receipts)
+            .only('id', 'receipt_id', 'total_amount', 'category')
+        }
+        
         # Build audit log entries
         audit_entries = []
         
-        for receipt in receipts.order_by('-uploaded_at'):
+        for receipt in receipts.select_related('verified_by').order_by('-uploaded_at'):
             extracted_data = receipt.extracted_data or {}
             processing_metadata = receipt.processing_metadata or {}
             
@@ -783,13 +791,13 @@ def audit_log_report(request):
                 }
             
             # Add transaction info if exists
-            try:
-                transaction = Transaction.objects.get(receipt=receipt)
+            transaction = transactions_by_receipt.get(receipt.id)
+            if transaction is not None:
                 entry['transaction_created'] = True
                 entry['transaction_id'] = transaction.id
                 entry['transaction_amount'] = float(transaction.total_amount)
                 entry['transaction_category'] = transaction.category
-            except Transaction.DoesNotExist:
+            else:
                 entry['transaction_created'] = False
             
             audit_entries.append(entry)